@@ -8,7 +8,7 @@ import sys
 import tempfile
 from math import ceil
 from pathlib import Path
-from typing import Optional, Any, NoReturn
+from typing import Optional, Any, NoReturn, List, Tuple, Dict
 
 """ AUTOMATICALLY GENERATED
 usage: __main__.py [-h] [-e [REGEX]] [-a] [-c [RESOLUTION]] [-f] [-v] [-d GECKODRIVER] [-s] [input]
@@ -45,6 +45,8 @@ firefox: Any = None
 
 cover_cache = {} # (artist,album) -> cover_data
 
+extract_hits: Dict[Optional[int], int] = {} # pattern index -> matched files (None for unmatched)
+
 
 def cover_cache_put(artist: str, album: str, cover: bytes):
     if not artist or not album or not cover:
@@ -63,6 +65,10 @@ def cover_cache_has(artist: str, album: str) -> bool:
     return (artist.lower(), album.lower()) in cover_cache
 
 
+def extract_hits_add(pattern_idx: Optional[int]):
+    extract_hits[pattern_idx] = extract_hits.get(pattern_idx, 0) + 1
+
+
 def vprint(*args, **kwargs):
     if not verbose:
         return
@@ -219,6 +225,36 @@ def sacad_fetch_album_cover(artist: str, album: str, resolution: int) -> Optiona
     return cover_b
 
 
+def load_extract_patterns(patterns_file: Path) -> List[str]:
+    """
+    Reads the extract regexes from the given file.
+    Each line is stripped of leading/trailing whitespace, then
+    empty lines and lines starting with '#' are ignored.
+    :param patterns_file: path of the file containing the regexes
+    :return: the regexes, in the same order of the file
+    """
+    with patterns_file.open(encoding="utf-8-sig") as f:
+        lines = [line.strip() for line in f]
+    return [line for line in lines if line and not line.startswith("#")]
+
+
+def extract_tags_from_filename(filename: str,
+                               extract_patterns: List[re.Pattern]) -> Optional[Tuple[int, dict]]:
+    """
+    Tries the given patterns in order against 'filename' and
+    returns the first one that matches, together with the extracted tags.
+    :param filename: the name of the mp3 file
+    :param extract_patterns: the compiled REGEX patterns, in order of priority
+    :return: the (pattern index, tags) pair, or None if no pattern matches
+    """
+    for idx, pattern in enumerate(extract_patterns):
+        match = pattern.search(filename)
+        if match:
+            return idx, match.groupdict()
+
+    return None
+
+
 def mp3norm(path: Path,
             # -i / -I
             info: bool,
@@ -226,7 +262,7 @@ def mp3norm(path: Path,
             # -e / -E
             extract: bool,
             force_extract: bool,
-            extract_pattern: re.Pattern,
+            extract_patterns: List[re.Pattern],
             # -a / -A
             fetch_album_name: bool,
             force_fetch_album_name: bool,
@@ -241,7 +277,7 @@ def mp3norm(path: Path,
     :param human_info: show the meta info of the mp3 file more human friendly
     :param extract: whether extract tags from the filename
     :param force_extract: whether extract tags even if those as already present
-    :param extract_pattern: the REGEX pattern to use for extraction
+    :param extract_patterns: the REGEX patterns to use for extraction (the first that matches wins)
     :param fetch_album_name: whether fetch album name from Google Search
     :param force_fetch_album_name: whether fetch album name if already present
     :param download_cover: whether download the cover of the album
@@ -258,6 +294,23 @@ def mp3norm(path: Path,
         vprint("\tSKIP")
         return
 
+    # Match the filename before loading the file: if extraction is the only
+    # action and it can't produce anything, the tags can't change
+    extracted = None
+    if extract:
+        extracted = extract_tags_from_filename(path.name, extract_patterns)
+
+        if not fetch_album_name and not download_cover and not info:
+            if not extracted:
+                extract_hits_add(None)
+                # With -e the tags might already be there (we don't know, the
+                # file is not loaded), so don't claim the filename is invalid
+                print("\tINVALID FILENAME" if force_extract else "\tNO PATTERN MATCHED")
+                return
+            if not force_extract and not any(extracted[1].values()):
+                vprint("\tSKIP")
+                return
+
     # 1. Retrieve the mp3 tags
     mp3 = eyed3.load(path)
 
@@ -313,15 +366,15 @@ def mp3norm(path: Path,
 
     # 2. Extract the tags from the filename
     if extract and (not artist or not title or not album or force_extract):
-        match = re.search(extract_pattern, path.name)
-
-        if not match:
+        if not extracted:
+            extract_hits_add(None)
             print("\tINVALID FILENAME")
             return
 
-        d = match.groupdict()
+        pattern_idx, d = extracted
+        extract_hits_add(pattern_idx)
 
-        vprint("\tTAGS EXTRACTED FROM FILENAME")
+        vprint(f"\tTAGS EXTRACTED FROM FILENAME (using \"{extract_patterns[pattern_idx].pattern}\")")
         vprint(f"\t\tARTIST = {s(d.get('artist'))}")
         vprint(f"\t\tTITLE  = {s(d.get('title'))}")
         vprint(f"\t\tALBUM  = {s(d.get('album'))}")
@@ -455,16 +508,25 @@ def main():
                         help="Prints the metadata of the given files well formatted")
     # --extract [<regex>]
     parser.add_argument("-e", "--extract",
-                        nargs="?", const=DEFAULT_TAGS_EXTRACTOR, default=False,
+                        nargs="?", action="append", const=None, default=None,
                         dest="extract", metavar="REGEX",
                         help=f"Extract tags from filename if those are missing, using the optional "
-                             f"regex (default is \"{DEFAULT_TAGS_EXTRACTOR}\")")
+                             f"regex (default is \"{DEFAULT_TAGS_EXTRACTOR}\"); "
+                             f"can be given multiple times, the first regex that matches is used")
     # --force-extract [<regex>]
     parser.add_argument("-E", "--force-extract",
-                        nargs="?", const=DEFAULT_TAGS_EXTRACTOR, default=False,
+                        nargs="?", action="append", const=None, default=None,
                         dest="force_extract", metavar="REGEX",
                         help=f"Extract tags from filename (always overwriting the previous values), "
-                             f"using the optional regex (default is \"{DEFAULT_TAGS_EXTRACTOR}\")")
+                             f"using the optional regex (default is \"{DEFAULT_TAGS_EXTRACTOR}\"); "
+                             f"can be given multiple times, the first regex that matches is used")
+    # --extract-patterns <file>
+    parser.add_argument("-p", "--extract-patterns",
+                        dest="extract_patterns", metavar="FILE",
+                        help="Read additional extract regexes from FILE (one per line, "
+                             "surrounding whitespace is ignored, '#' for comments), "
+                             "tried after the ones given with -e/-E "
+                             "(implies -e if neither -e nor -E is given)")
     # --album
     parser.add_argument("-a", "--album",
                         action="store_const", const=True, default=False,
@@ -521,6 +583,7 @@ def main():
     human_info = parsed.get("human_info")
     extract = parsed.get("extract")
     force_extract = parsed.get("force_extract")
+    extract_patterns_file = parsed.get("extract_patterns")
     cover = parsed.get("cover")
     force_cover = parsed.get("force_cover")
     precache = parsed.get("precache")
@@ -543,9 +606,16 @@ def main():
     if album and force_album:
         abort("Only one between -a and -A could be given")
 
-    extract_regex = extract or force_extract # one of the given REGEX
+    # The given REGEXes (a bare -e/-E stands for the default one)
+    extract_regexes = [r or DEFAULT_TAGS_EXTRACTOR for r in (extract or force_extract or [])]
+
+    # A patterns file alone implies -e
+    if extract_patterns_file and not (extract or force_extract):
+        extract = True
+
     cover_resolution = cover or force_cover # one of the given RESOLUTION
     do_extract = True if (extract or force_extract) else False
+    force_extract = True if force_extract else False
     do_cover = True if (cover or force_cover) else False
     do_album = True if (album or force_album) else False
     do_info = True if (info or human_info) else False
@@ -555,6 +625,30 @@ def main():
         abort("No action given, either --info, --[force-]extract, "
               "--[force-]cover or --[force-]album must be given")
 
+    # Read the regexes from the patterns file (if given)
+    if extract_patterns_file:
+        try:
+            extract_regexes += load_extract_patterns(Path(extract_patterns_file).expanduser())
+        except OSError as e:
+            abort(f"Can't read extract patterns file: '{extract_patterns_file}' ({e.strerror})")
+        except UnicodeDecodeError:
+            abort(f"Can't read extract patterns file: '{extract_patterns_file}' (not UTF-8)")
+
+    if do_extract and not extract_regexes:
+        abort(f"No extract regex found in patterns file: '{extract_patterns_file}'")
+
+    # Are regexes valid (if given)?
+    extract_patterns = []
+    for extract_regex in extract_regexes:
+        try:
+            extract_patterns.append(re.compile(extract_regex))
+        except:
+            abort(f"Invalid extract regex: '{extract_regex}'")
+
+    # Is given path valid?
+    if not mp3_input.exists():
+        abort(f"'{mp3_input}' does not exists")
+
     # Initialize selenium driver, if needed
     if do_album:
         # Driver path must be given album name have to be retrieved
@@ -564,18 +658,6 @@ def main():
 
         init_driver(driver, show_driver)
 
-    # Is regex valid (if given)?
-    extract_pattern = None
-    if extract_regex:
-        try:
-            extract_pattern = re.compile(extract_regex)
-        except:
-            abort(f"Invalid extract regex: '{extract_regex}'")
-
-    # Is given path valid?
-    if not mp3_input.exists():
-        abort(f"'{mp3_input}' does not exists")
-
     # Is a file or a directory?
     if mp3_input.is_file():
         mp3_input_files = [mp3_input]
@@ -607,13 +689,21 @@ def main():
                 human_info=human_info,
                 extract=do_extract,
                 force_extract=force_extract,
-                extract_pattern=extract_pattern,
+                extract_patterns=extract_patterns,
                 fetch_album_name=do_album,
                 force_fetch_album_name=force_album,
                 download_cover=do_cover,
                 force_download_cover=force_cover,
                 cover_resolution=cover_resolution)
 
+    # Report which pattern matched how many files
+    if do_extract:
+        print("EXTRACT PATTERNS HITS")
+        width = len(str(n))
+        for idx, pattern in enumerate(extract_patterns):
+            print(f"\t{str(extract_hits.get(idx, 0)).rjust(width)} | {pattern.pattern}")
+        print(f"\t{str(extract_hits.get(None, 0)).rjust(width)} | (no match)")
+
     if firefox and not show_driver:
         firefox.close()
 